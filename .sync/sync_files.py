@@ -6,12 +6,37 @@ Includes recursive subfolder synchronization and output extension transformation
 """
 
 import argparse
+import errno
 import json
 import logging
+import mmap
 import os
 import shutil
+import stat
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Set, Dict, Tuple
+from typing import BinaryIO, Callable, Dict, Iterator, List, Literal, Set, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+log = logging.getLogger(__name__)
+
+
+MMAP_MIN_SIZE = 64 * 1024
+COMPARE_CHUNK_SIZE = 64 * 1024
+COPY_BUFFER_SIZE = 1 << 20
+COPY_RANGE_SIZE = 1 << 24
+HAS_FADVISE = hasattr(os, 'posix_fadvise')
+# Only Linux sendfile accepts a regular file as the output (macOS needs a socket)
+USE_SENDFILE = sys.platform.startswith('linux') and hasattr(os, 'sendfile')
+SET_MATCH_MIN_EXTENSIONS = 64
 
 
 def setup_logging() -> None:
@@ -39,42 +64,106 @@ def load_config(config_path: str) -> Tuple[List[str], str]:
         KeyError: If required keys are missing in config
     """
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        if orjson is not None:
+            config = orjson.loads(Path(config_path).read_bytes())
+        else:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
         return config['file_extensions'], config.get('output_extension', '')
     except FileNotFoundError:
-        logging.error(f"Configuration file not found: {config_path}")
+        log.error("Configuration file not found: %s", config_path)
         raise
     except json.JSONDecodeError:
-        logging.error(f"Invalid JSON in configuration file: {config_path}")
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        log.error("Invalid JSON in configuration file: %s", config_path)
         raise
     except KeyError:
-        logging.error("Missing 'file_extensions' in configuration file")
+        log.error("Missing 'file_extensions' in configuration file")
         raise
 
 
-def get_directory_structure(base_path: Path) -> Dict[str, Set[str]]:
+def build_name_matcher(extensions: List[str]) -> Callable[[str], bool]:
     """
-    Get the directory structure including all subfolders.
+    Build a predicate telling whether a file name has one of the extensions.
+    
+    str.endswith with a tuple is fastest for typical lists, but it checks
+    each extension in turn. Long lists of single-dot extensions are instead
+    matched with one set lookup on the name's last suffix.
     
     Args:
-        base_path: Base directory path to scan
+        extensions: File extensions to match (e.g. ".js")
         
     Returns:
-        Dictionary mapping relative paths to sets of subfolder names
+        Function returning True for matching file names
     """
-    structure: Dict[str, Set[str]] = {}
+    simple = all(ext.startswith('.') and ext.count('.') == 1 for ext in extensions)
+    if simple and len(extensions) >= SET_MATCH_MIN_EXTENSIONS:
+        ext_set = frozenset(extensions)
+        return lambda name: name[name.rfind('.'):] in ext_set
     
-    for root, dirs, _ in os.walk(base_path):
-        rel_path = os.path.relpath(root, base_path)
-        if rel_path == '.':
-            # Handle the root directory
-            structure[''] = {d for d in dirs}
-        else:
-            # Handle subdirectories
-            structure[rel_path] = {d for d in dirs}
-            
-    return structure
+    ext_tuple = tuple(extensions)
+    return lambda name: name.endswith(ext_tuple)
+
+
+@dataclass(slots=True, frozen=True)
+class SyncConfig:
+    """Per-run sync settings, derived once from the configuration file."""
+    matches: Callable[[str], bool]
+    suffix: str
+
+
+def _scandir_dirs(path: str) -> Iterator[os.DirEntry]:
+    """
+    Yield the subdirectory entries of a directory.
+    
+    Like os.walk, symlinks to directories are included; callers decide
+    whether to descend into them.
+    
+    Args:
+        path: Directory path to scan
+        
+    Yields:
+        DirEntry objects for each subdirectory
+    """
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir():
+                yield entry
+
+
+def walk_common(
+    input_path: str,
+    output_path: str,
+    rel_path: str = ''
+) -> Iterator[Tuple[str, Set[str]]]:
+    """
+    Walk the input and output trees in lockstep, descending only into
+    subfolders present on both sides. Symlinked subfolders are listed but,
+    as with os.walk, not descended into.
+    
+    Args:
+        input_path: Input directory path at this level
+        output_path: Output directory path at this level
+        rel_path: Path of this level relative to the base directories
+        
+    Yields:
+        Tuples of (relative path, set of common subfolder names)
+    """
+    # Map each subfolder name to whether it is a symlink
+    input_dirs = {entry.name: entry.is_symlink() for entry in _scandir_dirs(input_path)}
+    output_dirs = {entry.name: entry.is_symlink() for entry in _scandir_dirs(output_path)}
+    common_dirs = input_dirs.keys() & output_dirs.keys()
+    
+    yield rel_path, common_dirs
+    
+    for name in common_dirs:
+        if input_dirs[name] or output_dirs[name]:
+            continue
+        yield from walk_common(
+            os.path.join(input_path, name),
+            os.path.join(output_path, name),
+            os.path.join(rel_path, name)
+        )
 
 
 def get_common_directory_structure(
@@ -91,93 +180,299 @@ def get_common_directory_structure(
     Returns:
         Dictionary mapping relative paths to sets of common subfolder names
     """
-    input_structure = get_directory_structure(input_path)
-    output_structure = get_directory_structure(output_path)
+    return {
+        rel_path: common_dirs
+        for rel_path, common_dirs in walk_common(os.fspath(input_path), os.fspath(output_path))
+        if common_dirs
+    }
+
+
+def files_identical(source_file: str, dest_file: str) -> bool:
+    """
+    Check whether two files have identical content.
+    
+    Sizes are compared first. Small files are read whole; larger ones are
+    memory-mapped and compared window by window, stopping at the first
+    differing window.
+    
+    Args:
+        source_file: Source file path
+        dest_file: Destination file path
+        
+    Returns:
+        True if both files have the same content
+    """
+    size = os.stat(source_file).st_size
+    if size != os.stat(dest_file).st_size:
+        return False
+    
+    with open(source_file, 'rb', buffering=0) as src, open(dest_file, 'rb', buffering=0) as dst:
+        fds = (src.fileno(), dst.fileno())
+        if HAS_FADVISE:
+            # Both files are read front to back, so ask for larger readahead
+            for fd in fds:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        
+        identical = _compare_open_files(src, dst, size)
+        
+        if identical and HAS_FADVISE:
+            # Identical files won't be read again, so drop them from the page cache
+            for fd in fds:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        
+        return identical
+
+
+def _compare_open_files(src: BinaryIO, dst: BinaryIO, size: int) -> bool:
+    """
+    Compare the contents of two open files of the same size.
+    
+    Args:
+        src: Source file opened for binary reading
+        dst: Destination file opened for binary reading
+        size: Size of both files in bytes
+        
+    Returns:
+        True if both files have the same content
+    """
+    if size < MMAP_MIN_SIZE:
+        return src.read() == dst.read()
+    
+    with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as src_map, \
+            mmap.mmap(dst.fileno(), 0, access=mmap.ACCESS_READ) as dst_map:
+        for offset in range(0, size, COMPARE_CHUNK_SIZE):
+            end = offset + COMPARE_CHUNK_SIZE
+            if src_map[offset:end] != dst_map[offset:end]:
+                return False
+        return True
+
+
+def copy_stream(src: BinaryIO, dst: BinaryIO) -> None:
+    """
+    Copy the contents of an open source file into an open destination file.
+    
+    Uses os.copy_file_range so the data is copied inside the kernel (and
+    reflinked on copy-on-write filesystems), falling back to a buffered
+    user-space copy where that is unsupported.
+    
+    Args:
+        src: Source file opened for binary reading, nothing read yet
+        dst: Destination file opened for binary writing, nothing written yet
+    """
+    if hasattr(os, 'copy_file_range'):
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+        try:
+            while os.copy_file_range(src_fd, dst_fd, COPY_RANGE_SIZE):
+                pass
+            return
+        except OSError as e:
+            if e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+            # Restart from scratch in case part of the range was copied
+            src.seek(0)
+            dst.seek(0)
+            dst.truncate()
+    
+    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+def _fast_copy(source_file: str, dest_file: str) -> None:
+    """
+    Copy a file and its metadata, moving the data with os.sendfile.
+    
+    Falls back to a buffered user-space copy on non-Linux platforms and
+    where sendfile is unsupported for the files involved.
+    
+    Args:
+        source_file: Source file path
+        dest_file: Destination file path
+    """
+    with open(source_file, 'rb') as src, open(dest_file, 'wb') as dst:
+        copied = False
+        if USE_SENDFILE:
+            size = os.fstat(src.fileno()).st_size
+            try:
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                copied = True
+            except OSError as e:
+                if e.errno not in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+                # Restart from scratch in case part of the file was sent
+                dst.seek(0)
+                dst.truncate()
+        
+        if not copied:
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+    shutil.copystat(source_file, dest_file)
+
+
+def _copy_times(source_file: str, dest_file: str) -> None:
+    """
+    Give the destination file the access and modification times of the source.
+    
+    Args:
+        source_file: Source file path
+        dest_file: Destination file path
+    """
+    st = os.stat(source_file)
+    os.utime(dest_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def _replace_file(source_file: str, dest_file: str) -> None:
+    """
+    Atomically replace a regular destination file with the source content.
     
-    common_structure: Dict[str, Set[str]] = {}
+    The content is written to a uniquely named temporary file next to the
+    destination and renamed over it. The destination keeps its permissions
+    but gets a new inode.
     
-    # Process all paths in input structure
-    for rel_path in input_structure:
-        if rel_path in output_structure:
-            # Find common subdirectories at this level
-            common_dirs = input_structure[rel_path].intersection(
-                output_structure[rel_path]
-            )
-            if common_dirs:
-                common_structure[rel_path] = common_dirs
-                
-    return common_structure
+    Args:
+        source_file: Source file path
+        dest_file: Destination file path (a regular file, not a symlink)
+    """
+    dest_mode = stat.S_IMODE(os.lstat(dest_file).st_mode)
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(dest_file), prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as dst, open(source_file, 'rb') as src:
+            copy_stream(src, dst)
+        os.chmod(tmp_file, dest_mode)
+        _copy_times(source_file, tmp_file)
+        os.replace(tmp_file, dest_file)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
 
 
-def copy_file_content(source_file: Path, dest_file: Path) -> None:
+def copy_file_content(source_file: str, dest_file: str) -> None:
     """
     Copy content from source file to destination file only if content differs.
     
+    Regular destination files are replaced atomically, so readers never see
+    a partially written file. Symlinked destinations are written through in
+    place so the link itself is kept. Either way the destination keeps its
+    permissions and takes the source's modification time.
+    
     Args:
         source_file: Source file path
         dest_file: Destination file path
     """
     try:
-        # Read source file content
-        with open(source_file, 'rb') as src:
-            source_content = src.read()
-            
-        # Read destination file content
-        with open(dest_file, 'rb') as dst:
-            dest_content = dst.read()
-            
         # Only update if content differs
-        if source_content != dest_content:
-            with open(dest_file, 'wb') as dst:
-                dst.write(source_content)
-            logging.info(f"Updated content: {dest_file} from {source_file}")
+        if not files_identical(source_file, dest_file):
+            if os.path.islink(dest_file):
+                with open(source_file, 'rb') as src, open(dest_file, 'wb') as dst:
+                    copy_stream(src, dst)
+                _copy_times(source_file, dest_file)
+            else:
+                _replace_file(source_file, dest_file)
+            log.info("Updated content: %s from %s", dest_file, source_file)
         else:
-            logging.debug(f"Skipped update of {dest_file} (content identical)")
+            log.debug("Skipped update of %s (content identical)", dest_file)
             
     except Exception as e:
-        logging.error(f"Error copying content from {source_file} to {dest_file}: {e}")
+        log.error("Error copying content from %s to %s: %s", source_file, dest_file, e)
         raise
 
 
-def clean_directory_smart(directory: Path, reference_dir: Path, extensions: List[str]) -> None:
+@dataclass(slots=True)
+class Action:
     """
-    Remove files in the destination directory that don't exist in the source directory.
+    A single file operation planned for a directory pair.
     
-    Args:
-        directory: Directory to clean (destination)
-        reference_dir: Reference directory to check against (source)
-        extensions: List of file extensions to consider
+    For 'delete' actions there is no source file and src is empty.
     """
-    for item in directory.iterdir():
-        if item.is_file() and any(item.name.endswith(ext) for ext in extensions):
-            # Check if corresponding file exists in reference directory
-            ref_file = reference_dir / item.name
-            if not ref_file.exists():
-                item.unlink()
-                logging.info(f"Deleted: {item} (not present in source)")
+    src: str
+    dst: str
+    kind: Literal['copy', 'update', 'delete']
 
 
-def get_output_filename(filename: str, output_extension: str) -> str:
+def plan_dir(
+    input_dir: str,
+    output_dir: str,
+    cfg: SyncConfig
+) -> List[Action]:
     """
-    Transform input filename to output filename based on output extension.
+    Plan the file operations needed to synchronize one directory pair.
+    
+    Files in the output directory that don't exist in the input directory are
+    deleted, files present on both sides are updated by content and files
+    only present in the input directory are copied.
     
     Args:
-        filename: Original filename
-        output_extension: Optional extension to append (without dot)
+        input_dir: Source directory path
+        output_dir: Destination directory path
+        cfg: Sync settings for this run
         
     Returns:
-        Transformed filename
+        List of planned actions
     """
-    if output_extension:
-        return f"{filename}.{output_extension}"
-    return filename
+    matches = cfg.matches
+    with os.scandir(input_dir) as it:
+        src_files = [
+            entry for entry in it
+            if entry.is_file() and matches(entry.name)
+        ]
+    src_names = frozenset(entry.name for entry in src_files)
+    
+    actions: List[Action] = []
+    output_names: Set[str] = set()
+    with os.scandir(output_dir) as it:
+        for entry in it:
+            if not entry.is_file():
+                # Directories and dangling symlinks don't count as existing files
+                continue
+            if matches(entry.name) and entry.name not in src_names:
+                # Remove files in output that don't exist in input
+                actions.append(Action('', entry.path, 'delete'))
+            else:
+                output_names.add(entry.name)
+    
+    for entry in src_files:
+        output_filename = entry.name + cfg.suffix
+        output_path = os.path.join(output_dir, output_filename)
+        if output_filename in output_names:
+            # If file exists in both places, update it only if the content differs
+            actions.append(Action(entry.path, output_path, 'update'))
+        else:
+            # If file only exists in source, copy it
+            actions.append(Action(entry.path, output_path, 'copy'))
+    
+    return actions
+
+
+def execute(actions: List[Action]) -> None:
+    """
+    Run planned file actions: deletions first, then updates, then new copies.
+    
+    Args:
+        actions: Actions produced by plan_dir
+    """
+    by_kind: Dict[str, List[Action]] = {'delete': [], 'update': [], 'copy': []}
+    for action in actions:
+        by_kind[action.kind].append(action)
+    
+    for action in by_kind['delete']:
+        os.unlink(action.dst)
+        log.info("Deleted: %s (not present in source)", action.dst)
+    
+    for action in by_kind['update']:
+        copy_file_content(action.src, action.dst)
+    
+    for action in by_kind['copy']:
+        _fast_copy(action.src, action.dst)
+        log.info("Copied new file: %s -> %s", action.src, action.dst)
 
 
 def sync_directory(
-    input_dir: Path,
-    output_dir: Path,
-    extensions: List[str],
-    output_extension: str
+    input_dir: str,
+    output_dir: str,
+    cfg: SyncConfig
 ) -> None:
     """
     Synchronize files with specified extensions from input to output directory.
@@ -186,33 +481,23 @@ def sync_directory(
     Args:
         input_dir: Source directory path
         output_dir: Destination directory path
-        extensions: List of file extensions to synchronize
-        output_extension: Optional extension to append to output files
+        cfg: Sync settings for this run
     """
-    # First, remove files in output that don't exist in input
-    clean_directory_smart(output_dir, input_dir, extensions)
-    
-    # Process each file in input directory
-    for file in input_dir.iterdir():
-        if file.is_file() and any(file.name.endswith(ext) for ext in extensions):
-            output_filename = get_output_filename(file.name, output_extension)
-            output_path = output_dir / output_filename
-            
-            if output_path.exists():
-                # If file exists in both places, copy content instead of replacing
-                copy_file_content(file, output_path)
-            else:
-                # If file only exists in source, copy it
-                shutil.copy2(file, output_path)
-                logging.info(f"Copied new file: {file} -> {output_path}")
+    log.info("Syncing directory: %s -> %s", input_dir, output_dir)
+    try:
+        actions = plan_dir(input_dir, output_dir, cfg)
+    except FileNotFoundError as e:
+        # The structure scan found both directories; one was removed since
+        log.warning("Skipped %s -> %s: %s no longer exists", input_dir, output_dir, e.filename)
+        return
+    execute(actions)
 
 
 def sync_directories_recursive(
     input_base: Path,
     output_base: Path,
     common_structure: Dict[str, Set[str]],
-    extensions: List[str],
-    output_extension: str
+    cfg: SyncConfig
 ) -> None:
     """
     Recursively synchronize directories and their subdirectories.
@@ -221,37 +506,46 @@ def sync_directories_recursive(
         input_base: Base input directory path
         output_base: Base output directory path
         common_structure: Dictionary of common directories and their subdirectories
-        extensions: List of file extensions to synchronize
-        output_extension: Optional extension to append to output files
-    """
-    # Process root level first if present
-    if '' in common_structure:
-        for dir_name in common_structure['']:
-            input_dir = input_base / dir_name
-            output_dir = output_base / dir_name
-            logging.info(f"Syncing directory: {dir_name}")
-            sync_directory(input_dir, output_dir, extensions, output_extension)
-    
-    # Process all other paths
+        cfg: Sync settings for this run
+    """
+    # Work with plain string paths to keep path handling cheap
+    input_root = os.fspath(input_base)
+    output_root = os.fspath(output_base)
+    
+    # Every common directory appears exactly once as a subfolder of its
+    # parent entry, so a single pass over those subfolders visits each
+    # directory once; root-level directories form the first phase. The
+    # structure only lists folders found on both sides, so no existence
+    # checks are needed here
+    root_dirs: List[Tuple[str, str]] = []
+    nested_dirs: List[Tuple[str, str]] = []
+    visited: Set[str] = set()
+    
     for rel_path, subdirs in common_structure.items():
-        if rel_path == '':
-            continue
-            
-        # Create Path objects for the current level
-        current_input = input_base / rel_path
-        current_output = output_base / rel_path
-        
-        # Sync current directory
-        logging.info(f"Syncing directory: {rel_path}")
-        sync_directory(current_input, current_output, extensions, output_extension)
-        
-        # Process subdirectories at this level
         for subdir in subdirs:
-            input_subdir = current_input / subdir
-            output_subdir = current_output / subdir
-            if input_subdir.exists() and output_subdir.exists():
-                logging.info(f"Syncing subdirectory: {rel_path}/{subdir}")
-                sync_directory(input_subdir, output_subdir, extensions, output_extension)
+            dir_rel_path = os.path.join(rel_path, subdir)
+            if dir_rel_path in visited:
+                continue
+            visited.add(dir_rel_path)
+            
+            input_dir = os.path.join(input_root, dir_rel_path)
+            output_dir = os.path.join(output_root, dir_rel_path)
+            if rel_path == '':
+                root_dirs.append((input_dir, output_dir))
+            else:
+                nested_dirs.append((input_dir, output_dir))
+    
+    # Directories are independent of each other, so run each phase on a
+    # thread pool to overlap file I/O latency; logging handlers are
+    # thread-safe, so each worker logs the directory it is syncing
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for phase in (root_dirs, nested_dirs):
+            # Consuming the results waits for the phase and re-raises errors
+            list(executor.map(
+                lambda dirs: sync_directory(dirs[0], dirs[1], cfg),
+                phase
+            ))
 
 
 def main(input_path: str, output_path: str, config_path: str) -> None:
@@ -277,21 +571,26 @@ def main(input_path: str, output_path: str, config_path: str) -> None:
     
     # Load configuration
     extensions, output_extension = load_config(config_path)
-    logging.info(f"Loaded extensions to sync: {extensions}")
+    log.info("Loaded extensions to sync: %s", extensions)
     if output_extension:
-        logging.info(f"Output files will have .{output_extension} extension appended")
+        log.info("Output files will have .%s extension appended", output_extension)
+    
+    # Derive the per-run settings once; the output suffix never changes
+    cfg = SyncConfig(
+        matches=build_name_matcher(extensions),
+        suffix=f".{output_extension}" if output_extension else ""
+    )
     
     # Find common directory structure
     common_structure = get_common_directory_structure(input_base, output_base)
-    logging.info(f"Found common directory structure: {common_structure}")
+    log.info("Found common directory structure: %s", common_structure)
     
     # Sync all directories recursively
     sync_directories_recursive(
         input_base,
         output_base,
         common_structure,
-        extensions,
-        output_extension
+        cfg
     )
 
 
@@ -319,7 +618,7 @@ if __name__ == "__main__":
     
     try:
         main(args.input, args.output, args.config)
-        logging.info("Synchronization completed successfully")
+        log.info("Synchronization completed successfully")
     except Exception as e:
-        logging.error(f"Error during synchronization: {e}")
+        log.error("Error during synchronization: %s", e)
         raise
\ No newline at end of file